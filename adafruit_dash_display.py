@@ -23,24 +23,76 @@ Implementation Notes
 
 """
 try:
-    from typing import Tuple, Callable, Optional, Any
+    from typing import Tuple, Callable, Optional, Any, Union, Sequence, Dict
     from adafruit_io.adafruit_io import IO_MQTT
+    from adafruit_display_text.label import Label
     from digitalio import DigitalInOut
 except ImportError:
     pass
 
+try:
+    # keypad only exists on CircuitPython, so it is named by string in annotations
+    from keypad import Keys, EventQueue
+except ImportError:
+    pass
+
 import time
-from collections import OrderedDict
+from micropython import const
 import displayio
-import terminalio
 from adafruit_display_shapes.rect import Rect
-from adafruit_display_text.label import Label
+
+# pylint: disable-next=ungrouped-imports
+from adafruit_io.adafruit_io import validate_feed_key
 
 __version__ = "0.0.0+auto.0"
 __repo__ = "https://github.com/adafruit/Adafruit_CircuitPython_Dash_Display.git"
 
+_DEBOUNCE_NS = const(150_000_000)
+
+_UP = const(0)
+_SELECT = const(1)
+_DOWN = const(2)
+
+
+def _invert_rgb(rgb: int) -> int:
+    """Inverts each channel of an RGB888 color. Applying it twice gives back the
+    original color.
+
+    :param int rgb: The color to invert.
+    :return: The inverted color.
+    """
+    return 0xFFFFFF ^ rgb
 
-class Feed:
+
+def _coercer(template: str) -> Callable:
+    """Picks the type a message has to be converted to before it can be formatted into
+    ``template``, based on the format spec of its first replacement field.
+
+    :param str template: String with a formatting placeholder within it.
+    :return: ``float``, ``int`` or ``str``.
+    """
+    start = template.find("{")
+    # "{{" is an escaped brace, not a replacement field
+    while start >= 0 and template.startswith("{", start + 1):
+        start = template.find("{", start + 2)
+    if start < 0:
+        return str
+    spec = template[start + 1 : template.find("}", start)].partition(":")[2]
+    if len(spec) > 1 and spec[1] in "<>=^":
+        # Drop the fill character, which may be any character at all
+        spec = spec[1:]
+    kind = spec[-1:]
+    if kind and kind in "eEfFgGn%":
+        return float
+    if kind and kind in "bcdoxX":
+        return int
+    if "," in spec or "_" in spec or "=" in spec:
+        # These options are only valid for numbers
+        return float
+    return str
+
+
+class Feed:  # pylint: disable=too-many-instance-attributes
     """Feed object to make getting and setting different feed properties easier
 
     :param str key: The Adafruit IO key.
@@ -50,9 +102,31 @@ class Feed:
     :param Callable callback: A function to call when the feed is fetched.
     :param int color: Hex color code for the feed text.
     :param Callable pub: a function to call when data is published to the feed.
+    :param int index: The position of the feed on the dashboard.
+    :param Label label: The label that displays the feed.
+
+    Apart from ``text``, these are all plain attributes that can be read and
+    changed directly. ``last_val`` holds the last value received for the feed and
+    ``last_color`` the last color its color callback returned.
 
     """
 
+    __slots__ = (
+        "key",
+        "default_text",
+        "_text",
+        "_coerce",
+        "_prefix",
+        "_suffix",
+        "callback",
+        "color",
+        "pub",
+        "index",
+        "label",
+        "last_val",
+        "last_color",
+    )
+
     def __init__(
         self,
         key: str,
@@ -62,29 +136,19 @@ class Feed:
         color: Optional[int],
         pub: Optional[Callable],
         index: int,
+        label: Optional[Label] = None,
     ):  # pylint: disable=too-many-arguments
-        self._key = key
+        self.key = key
         self.default_text = default_text
-        self._text = formatted_text
-        self._callback = callback
-        self._color = color
-        self._pub = pub
+        self.text = formatted_text
+        self.callback = callback
+        self.color = color
+        self.pub = pub
         self.index = index
+        self.label = label
 
-        self._last_val = None
-
-    @property
-    def key(self) -> str:
-        """Getter for feed key. Will give the value of the feed key"""
-        return self._key
-
-    @key.setter
-    def key(self, value: str) -> None:
-        """Setter for feed key. Sets a new value for the feed key property _key
-
-        :param str value: The new value of the feed key.
-        """
-        self._key = value
+        self.last_val = None
+        self.last_color = None
 
     @property
     def text(self) -> str:
@@ -98,55 +162,30 @@ class Feed:
         :param str value: The new value of the feed text.
         """
         self._text = value
+        self._coerce = _coercer(value)
+        # A bare "{}" placeholder is just concatenation, so skip str.format for it
+        prefix, field, suffix = value.partition("{}")
+        rest = prefix + suffix
+        if field and "{" not in rest and "}" not in rest:
+            self._prefix, self._suffix = prefix, suffix
+        else:
+            self._prefix = self._suffix = None
 
-    @property
-    def callback(self) -> Optional[Callable]:
-        """Getter for callback function. Returns the feed callback"""
-        return self._callback
-
-    @callback.setter
-    def callback(self, value: Callable) -> None:
-        """Setter for callback function. Changes the feed callback
-
-        :param Callable value: A function to call when the feed is fetched.
-        """
-        self._callback = value
-
-    @property
-    def color(self) -> int:
-        """Getter for text color callback function. Will return the color for the feed"""
-        return self._color
-
-    @color.setter
-    def color(self, value: int) -> None:
-        """Setter for text color callback function
-
-        :param int value: The new value of the feed color.
-        """
-        self._color = value
-
-    @property
-    def pub(self) -> Optional[Callable]:
-        """Getter for publish function, called when a new value is published by this library."""
-        return self._pub
-
-    @pub.setter
-    def pub(self, value: Callable) -> None:
-        """Setter for publish function"""
-        self._pub = value
-
-    @property
-    def last_val(self) -> Optional[str]:
-        """Getter for the last value received"""
-        return self._last_val
-
-    @last_val.setter
-    def last_val(self, value: str) -> None:
-        """Setter for last received value
+    def format(self, message: str) -> str:
+        """Formats a received value into the feed text
 
-        :param str value: The newly received value.
+        :param str message: The value received from Adafruit IO.
+        :return: The feed text with the value formatted into it.
         """
-        self._last_val = value
+        if self._prefix is not None:
+            return self._prefix + str(message) + self._suffix
+        try:
+            return self._text.format(self._coerce(message))
+        except ValueError:
+            # The format spec wants a number that _coercer didn't recognise
+            text = self._text.format(float(message))
+            self._coerce = float
+            return text
 
 
 class Hub:  # pylint: disable=too-many-instance-attributes
@@ -155,25 +194,49 @@ class Hub:  # pylint: disable=too-many-instance-attributes
 
     :param displayio.Display display: The display for the dashboard.
     :param IO_MQTT io_mqtt: MQTT communications object.
-    :param Tuple[DigitalInOut, ...] nav: The navigation pushbuttons.
+    :param nav: The navigation pushbuttons, either as a tuple of
+        ``(up, select, down, back, submit)`` inputs, or as a `keypad.Keys` or
+        `keypad.EventQueue` whose key numbers 0, 1 and 2 are up, select and down.
+    :type nav: Tuple[DigitalInOut, ...], keypad.Keys or keypad.EventQueue
+    :param bool debug: Print every subscription, get, publish and received message.
+        Defaults to False, since printing to the serial console is slow enough to
+        hold up the MQTT loop.
     """
 
     def __init__(
         self,
         display: displayio.Display,
         io_mqtt: IO_MQTT,
-        nav: Tuple[DigitalInOut, ...],
+        nav: Union[Tuple[DigitalInOut, ...], "Keys", "EventQueue"],
+        debug: bool = False,
     ):
         self.display = display
+        self._debug = debug
 
         self.io_mqtt = io_mqtt
 
-        self.up_btn, self.select, self.down, self.back, self.submit = nav
+        if hasattr(nav, "events"):
+            nav = nav.events
+        if hasattr(nav, "get"):
+            self._events = nav
+            self.up_btn = self.select = self.down = self.back = self.submit = None
+        else:
+            self._events = None
+            self.up_btn, self.select, self.down, self.back, self.submit = nav
+        # Indexed by key number, like keypad events
+        self._nav_inputs = (self.up_btn, self.select, self.down)
+        self._nav_prev = [False, False, False]
 
         self.length = 0
         self.selected = 1
+        self._next_y = 15
+
+        self._last_press_ns = 0
 
-        self.feeds = OrderedDict()
+        self.feeds = {}
+        self._feed_list = []
+        self._pending_subs = []
+        self._pub_queue = {}
 
         self.io_mqtt.on_mqtt_connect = self.connected
         self.io_mqtt.on_mqtt_disconnect = self.disconnected
@@ -203,17 +266,11 @@ class Hub:  # pylint: disable=too-many-instance-attributes
         to set the text
 
         :param IO_MQTT client: The MQTT client to use.
-        :param str feed_id: The Adafruit IO feed ID.
+        :param str feed_id: The Adafruit IO feed key, without the username/feeds/ prefix.
         :param str message: The text to display.
         :return: A string with data formatted into it.
         """
-        feed_id = feed_id.split("/")[-1]
-        feed = self.feeds[feed_id]
-        try:
-            text = feed.text.format(message)
-        except ValueError:
-            text = feed.text.format(float(message))
-        return text
+        return self.feeds[feed_id].format(message)
 
     def update_text(self, client: IO_MQTT, feed_id: str, message: str) -> None:
         """Updates the text on the display
@@ -223,10 +280,20 @@ class Hub:  # pylint: disable=too-many-instance-attributes
         :param str message: The text to display.
         """
         feed = self.feeds[feed_id]
-        feed.callback(client, feed_id, message)
-        self.splash[feed.index + 1].text = feed.callback(client, feed_id, str(message))
-        if feed.color:
-            self.splash[feed.index + 1].color = feed.color(message)
+        label = feed.label
+        color = feed.color
+        # Label writes re-render the text, so skip them when nothing changed
+        text = feed.callback(client, feed_id, str(message))
+        if text != label.text:
+            label.text = text
+        if color:
+            new_color = color(message)
+            if new_color != feed.last_color:
+                feed.last_color = new_color
+                # The highlighted row is drawn inverted, and _move inverts it back
+                if feed.index + 1 == self.selected:
+                    new_color = _invert_rgb(new_color)
+                label.color = new_color
 
     def base_pub(self, var: Any) -> None:
         """Default function called when a feed is published to"""
@@ -251,6 +318,48 @@ class Hub:  # pylint: disable=too-many-instance-attributes
         :param Callable pub_method: The pub_method to be called
             when data is published.
         """
+        self.splash.append(
+            self._new_device(
+                feed_key,
+                default_text,
+                formatted_text,
+                color_callback,
+                callback,
+                pub_method,
+            )
+        )
+
+    def add_devices(self, devices: Sequence[Dict[str, Any]]) -> None:
+        """Adds several feeds/devices to the UI at once. All of the labels are built
+        before any of them are added to the display.
+
+        :param devices: The keyword arguments to `add_device` for each device.
+        """
+        labels = [self._new_device(**device) for device in devices]
+        for label in labels:
+            self.splash.append(label)
+
+    def _new_device(  # pylint: disable=too-many-arguments
+        self,
+        feed_key: str,
+        default_text: Optional[str] = None,
+        formatted_text: Optional[str] = None,
+        color_callback: Optional[int] = None,
+        callback: Optional[Callable] = None,
+        pub_method: Optional[Callable] = None,
+    ) -> Label:
+        """Registers a feed/device and builds its label, without adding the label to the
+        display. Takes the same arguments as `add_device`.
+
+        :return: The label for the device.
+        """
+        # Subscriptions are batched, so check the key now rather than when they're sent
+        validate_feed_key(feed_key)
+        # Loaded on first use so a Hub without devices doesn't hold the text library
+        # pylint: disable=import-outside-toplevel,redefined-outer-name
+        import terminalio
+        from adafruit_display_text.label import Label
+
         if not callback:
             callback = self.simple_text_callback
         if not pub_method:
@@ -261,32 +370,21 @@ class Hub:  # pylint: disable=too-many-instance-attributes
         if not default_text:
             default_text = feed_key
 
-        self.io_mqtt.subscribe(feed_key)
-        if len(self.splash) == 1:
-            self.splash.append(
-                Label(
-                    font=terminalio.FONT,
-                    text=default_text,
-                    x=3,
-                    y=15,
-                    anchored_position=(3, 15),
-                    scale=2,
-                    color=0x000000,
-                )
-            )
-        else:
-            self.splash.append(
-                Label(
-                    font=terminalio.FONT,
-                    x=3,
-                    y=((len(self.splash) - 1) * 30) + 15,
-                    text=default_text,
-                    color=0xFFFFFF,
-                    anchored_position=(3, ((len(self.splash) - 2) * 30) + 15),
-                    scale=2,
-                )
-            )
-        self.length = len(self.splash) - 2
+        self._pending_subs.append(feed_key)
+        index = len(self.feeds)
+        y = self._next_y
+        self._next_y += 30
+        label = Label(
+            font=terminalio.FONT,
+            text=default_text,
+            x=3,
+            y=y,
+            anchored_position=(3, max(y - 30, 15)),
+            scale=2,
+            # The first feed starts out highlighted, in black on the white bar
+            color=0xFFFFFF if index else 0x000000,
+        )
+        self.length = index
         self.feeds[feed_key] = Feed(
             key=feed_key,
             default_text=default_text,
@@ -294,16 +392,50 @@ class Hub:  # pylint: disable=too-many-instance-attributes
             callback=callback,
             color=color_callback,
             pub=pub_method,
-            index=len(self.feeds),
+            index=index,
+            label=label,
+        )
+        self._feed_list.append(self.feeds[feed_key])
+        return label
+
+    def _flush_subscriptions(self) -> None:
+        """Subscribes to every feed added since the last flush with a single
+        multi-topic SUBSCRIBE packet"""
+        if not self._pending_subs:
+            return
+        # IO_MQTT.subscribe only takes one feed per call, so hand the whole list
+        # to the underlying MiniMQTT client instead, using IO_MQTT's topic form.
+        # This copies the "{user}/f/{key}" topics IO_MQTT.subscribe uses as of
+        # adafruit_io 6.2.0 and reads its private _user and _client, so it has to
+        # follow any change to those.
+        # The keys were already checked with validate_feed_key in add_device.
+        # pylint: disable=protected-access
+        user = self.io_mqtt._user
+        self.io_mqtt._client.subscribe(
+            [(f"{user}/f/{feed_key}", 0) for feed_key in self._pending_subs]
         )
+        self._pending_subs = []
 
-    def get(self) -> None:
-        """Gets all the subscribed feeds"""
-        for feed in self.feeds.keys():
-            print(f"getting {feed}")
+    def get(self, timeout: float = 2, loop_timeout: float = 1) -> None:
+        """Subscribes to and gets all the added feeds, then loops Adafruit IO until every
+        feed has a value or ``timeout`` seconds have passed
+
+        :param float timeout: The longest time to wait for the feed values, in seconds.
+        :param float loop_timeout: How long each MQTT loop waits for messages, in
+            seconds. A short wait lets this return soon after the last feed answers,
+            but it must be no less than the MQTT client's ``socket_timeout``.
+        """
+        self._flush_subscriptions()
+        for feed in self.feeds:
+            if self._debug:
+                print(f"getting {feed}")
             self.io_mqtt.get(feed)
-            time.sleep(0.1)
-        self.io_mqtt.loop()
+        deadline = time.monotonic() + timeout
+        self.io_mqtt.loop(loop_timeout)
+        while time.monotonic() < deadline and any(
+            feed.last_val is None for feed in self._feed_list
+        ):
+            self.io_mqtt.loop(loop_timeout)
 
     # pylint: disable=unused-argument
     @staticmethod
@@ -314,8 +446,9 @@ class Hub:  # pylint: disable=too-many-instance-attributes
         """
         print("Connected to Adafruit IO!")
 
-    @staticmethod
-    def subscribe(client: IO_MQTT, userdata: Any, topic: str, granted_qos: str) -> None:
+    def subscribe(
+        self, client: IO_MQTT, userdata: Any, topic: str, granted_qos: str
+    ) -> None:
         """Callback for when a new feed is subscribed to
 
         :param IO_MQTT client: The MQTT client to use.
@@ -323,7 +456,8 @@ class Hub:  # pylint: disable=too-many-instance-attributes
         :param str topic: The topic to subscribe to.
         :param str granted_qos: The QoS level.
         """
-        print(f"Subscribed to {topic} with QOS level {granted_qos}")
+        if self._debug:
+            print(f"Subscribed to {topic} with QOS level {granted_qos}")
 
     @staticmethod
     def disconnected(client: IO_MQTT) -> None:
@@ -340,68 +474,112 @@ class Hub:  # pylint: disable=too-many-instance-attributes
         :param str feed_id: The Adafruit IO feed ID.
         :param str message: The message received.
         """
-        print(f"Feed {feed_id} received new value: {message}")
-        feed_id = feed_id.split("/")[-1]
-        feed = self.feeds[feed_id]
+        if self._debug:
+            print(f"Feed {feed_id} received new value: {message}")
+        # IO_MQTT normally hands over the bare feed key already
+        feed = self.feeds.get(feed_id) or self.feeds[feed_id.rpartition("/")[2]]
         feed.last_val = message
-        self.update_text(client, feed_id, str(message))
+        self.update_text(client, feed.key, str(message))
 
     def publish(self, feed: Feed, message: str) -> None:
-        """Callback for publishing a message
+        """Callback for publishing a message. The message is queued and sent on the
+        next `loop`. If the feed is published to again before then, only the newest
+        message is sent.
 
         :param Feed feed: The feed to publish to.
         :param str message: The message to publish.
         """
-        print(f"Publishing {message} to {feed}")
-        self.io_mqtt.publish(feed, message)
-
-    def loop(self) -> None:
-        """Loops Adafruit IO and also checks to see if any buttons have been pressed"""
-        self.io_mqtt.loop()
-        if self.select.value:
-            feed = self.feeds[list(self.feeds.keys())[self.selected - 1]]
+        self._pub_queue[feed] = message
+
+    def _flush_publishes(self) -> None:
+        """Sends every message queued by `publish`. Each message leaves the queue before
+        it is sent, so if publishing raises, the messages already sent aren't repeated
+        and only the ones not yet tried are left for the next `loop`."""
+        queue = self._pub_queue
+        if not queue:
+            return
+        for feed in list(queue):
+            message = queue.pop(feed)
+            if self._debug:
+                print(f"Publishing {message} to {feed}")
+            self.io_mqtt.publish(feed, message)
+
+    def _nav(self, key_number: int) -> None:
+        """Acts on a navigation button press
+
+        :param int key_number: The button that was pressed, 0 for up, 1 for select
+            and 2 for down.
+        """
+        if key_number == _SELECT:
+            feed = self._feed_list[self.selected - 1]
             if feed.pub:
                 feed.pub(feed.last_val)
-                self.display.root_group = self.splash
-            while self.select.value:
-                pass
-
-        if self.down.value and self.selected < self.length + 1:
-            rgb = self.splash[self.selected].color
-            color = (
-                ((255 - ((rgb >> 16) & 0xFF)) << 16)
-                + ((255 - ((rgb >> 8) & 0xFF)) << 8)
-                + (255 - (rgb & 0xFF))
-            )
-            self.splash[self.selected].color = color
+                # pub methods may show their own group, put the dashboard back
+                display, splash = self.display, self.splash
+                if display.root_group is not splash:
+                    display.root_group = splash
 
-            self.rect.y += 30
-            self.selected += 1
+        elif key_number == _DOWN:
+            self._move(1)
 
-            rgb = self.splash[self.selected].color
-            color = (
-                ((255 - ((rgb >> 16) & 0xFF)) << 16)
-                + ((255 - ((rgb >> 8) & 0xFF)) << 8)
-                + (255 - (rgb & 0xFF))
-            )
-            self.splash[self.selected].color = color
-
-        if self.up_btn.value and self.selected > 1:
-            rgb = self.splash[self.selected].color
-            color = (
-                ((255 - ((rgb >> 16) & 0xFF)) << 16)
-                + ((255 - ((rgb >> 8) & 0xFF)) << 8)
-                + (255 - (rgb & 0xFF))
-            )
-            self.splash[self.selected].color = color
+        elif key_number == _UP:
+            self._move(-1)
 
-            self.rect.y -= 30
-            self.selected -= 1
+    def _move(self, delta: int) -> None:
+        """Moves the highlight by ``delta`` rows, unless that would leave the dashboard
 
-            rgb = self.splash[self.selected].color
-            color = (
-                ((255 - ((rgb >> 16) & 0xFF)) << 16)
-                + ((255 - ((rgb >> 8) & 0xFF)) << 8)
-                + (255 - (rgb & 0xFF))
-            )
-            self.splash[self.selected].color = color
+        :param int delta: The number of rows to move, positive to move down.
+        """
+        old = self.selected
+        selected = old + delta
+        if not 1 <= selected <= self.length + 1:
+            return
+        # Swap both rows between their normal and highlighted colors
+        splash = self.splash
+        label = splash[old]
+        label.color = _invert_rgb(label.color)
+        label = splash[selected]
+        label.color = _invert_rgb(label.color)
+        self.rect.y += 30 * delta
+        self.selected = selected
+
+    def _poll_nav(self) -> None:
+        """Reads the navigation inputs and acts on any new presses. A press only counts
+        on the edge where the button goes down, and bounces right after an accepted press
+        are ignored."""
+        now = time.monotonic_ns()
+        prev = self._nav_prev
+        for key_number, button in enumerate(self._nav_inputs):
+            value = button.value
+            if (
+                value
+                and not prev[key_number]
+                and now - self._last_press_ns > _DEBOUNCE_NS
+            ):
+                self._last_press_ns = now
+                self._nav(key_number)
+            prev[key_number] = value
+
+    def _service_nav(self) -> None:
+        """Acts on any navigation button presses since the last call"""
+        events = self._events
+        if events is None:
+            self._poll_nav()
+            return
+        event = events.get()
+        while event:
+            if event.pressed:
+                self._nav(event.key_number)
+            event = events.get()
+
+    def loop(self, timeout: float = 1) -> None:
+        """Loops Adafruit IO and also checks to see if any buttons have been pressed
+
+        :param float timeout: How long to wait for Adafruit IO messages, in seconds. The
+            buttons are not checked during this time, so keep it short. It can't be less
+            than the MQTT client's ``socket_timeout``.
+        """
+        self._flush_subscriptions()
+        self._flush_publishes()
+        self.io_mqtt.loop(timeout)
+        self._service_nav()
@@ -34,6 +34,9 @@ autodoc_mock_imports = [
     "terminalio",
     "digitalio",
     "busio",
+    "keypad",
+    "micropython",
+    "adafruit_io",
 ]
 
 intersphinx_mapping = {
@@ -6,27 +6,34 @@ import ssl
 from os import getenv
 import displayio
 import board
-from digitalio import DigitalInOut, Direction, Pull
+import keypad
 from adafruit_display_text.label import Label
 import terminalio
 import touchio
 import socketpool
 import wifi
+from micropython import const
 import adafruit_minimqtt.adafruit_minimqtt as MQTT
 from adafruit_io.adafruit_io import IO_MQTT
 from adafruit_dash_display import Hub
 
-up = DigitalInOut(board.BUTTON_UP)
-up.direction = Direction.INPUT
-up.pull = Pull.DOWN
-
-select = DigitalInOut(board.BUTTON_SELECT)
-select.direction = Direction.INPUT
-select.pull = Pull.DOWN
+# Key numbers 0, 1 and 2 are up, select and down, the order Hub expects
+_UP = const(0)
+_SELECT = const(1)
+_DOWN = const(2)
+nav_keys = keypad.Keys(
+    (board.BUTTON_UP, board.BUTTON_SELECT, board.BUTTON_DOWN),
+    value_when_pressed=True,
+    pull=True,
+)
+event = keypad.Event()
 
-down = DigitalInOut(board.BUTTON_DOWN)
-down.direction = Direction.INPUT
-down.pull = Pull.DOWN
+# Index of the red value label in the RGB picker, after the three channel names
+_VALUE_LABELS = const(3)
+_GREEN = const(0x00FF00)
+_RED = const(0xFF0000)
+# Shortest time between picker redraws, for about 30 frames a second
+_FRAME_NS = const(33_000_000)
 
 back = touchio.TouchIn(board.CAP7)
 submit = touchio.TouchIn(board.CAP8)
@@ -50,136 +57,131 @@ if not secrets:
         print("WiFi secrets are kept in settings.toml, please add them there!")
         raise
 
-rgb_group = displayio.Group()
-R_label = Label(
-    terminalio.FONT,
-    text="   +\nR:\n   -",
-    color=0xFFFFFF,
-    anchor_point=((0, 0.5)),
-    anchored_position=((5, 120)),
-    scale=2,
-)
-G_label = Label(
-    terminalio.FONT,
-    text="   +\nG:\n   -",
-    color=0xFFFFFF,
-    anchor_point=((0, 0.5)),
-    anchored_position=((90, 120)),
-    scale=2,
-)
-B_label = Label(
-    terminalio.FONT,
-    text="   +\nB:\n   -",
-    color=0xFFFFFF,
-    anchor_point=((0, 0.5)),
-    anchored_position=((175, 120)),
-    scale=2,
-)
-rgb_group.append(R_label)
-rgb_group.append(G_label)
-rgb_group.append(B_label)
-R = Label(
-    terminalio.FONT,
-    text="00",
-    color=0xFFFFFF,
-    anchor_point=((0, 0.5)),
-    anchored_position=((35, 120)),
-    scale=2,
-)
-G = Label(
-    terminalio.FONT,
-    text="00",
-    color=0xFFFFFF,
-    anchor_point=((0, 0.5)),
-    anchored_position=((120, 120)),
-    scale=2,
-)
-B = Label(
-    terminalio.FONT,
-    text="00",
-    color=0xFFFFFF,
-    anchor_point=((0, 0.5)),
-    anchored_position=((205, 120)),
-    scale=2,
-)
-rgb_group.append(R)
-rgb_group.append(G)
-rgb_group.append(B)
+# The picker is only built the first time it is opened, so it costs no RAM until then
+rgb_group = None
+
+
+def build_rgb_group():
+    group = displayio.Group()
+    # The channel names come first, then the channel values from _VALUE_LABELS on
+    for label_text, label_x in (
+        ("   +\nR:\n   -", 5),
+        ("   +\nG:\n   -", 90),
+        ("   +\nB:\n   -", 175),
+        ("00", 35),
+        ("00", 120),
+        ("00", 205),
+    ):
+        group.append(
+            Label(
+                terminalio.FONT,
+                text=label_text,
+                color=0xFFFFFF,
+                anchor_point=(0, 0.5),
+                anchored_position=(label_x, 120),
+                scale=2,
+            )
+        )
+    return group
+
 
 # pylint: disable=unused-argument
 
 
+def show_channel(index, value):
+    # Relabelling re-renders the glyphs, so only do it when the text changes
+    text = "%02x" % value
+    label = rgb_group[_VALUE_LABELS + index]
+    if label.text != text:
+        label.text = text
+
+
 def rgb(last):
-    display.root_group = None
-    rgb_group[3].text = "00"
-    rgb_group[4].text = "00"
-    rgb_group[5].text = "00"
+    global rgb_group  # pylint: disable=global-statement
+    if rgb_group is None:
+        rgb_group = build_rgb_group()
+    # Held buttons step a channel every 10 ms, faster than the panel can usefully
+    # redraw, so refresh by hand at no more than 30 frames a second while open
+    display.auto_refresh = False
+    show_channel(0, 0)
+    show_channel(1, 0)
+    show_channel(2, 0)
     display.root_group = rgb_group
-    time.sleep(0.2)
+    display.refresh()
+    dirty = False
+    next_refresh = time.monotonic_ns()
     index = 0
     colors = [00, 00, 00]
+    held = None
 
     while True:
-        if select.value:
-            index += 1
-            if index == 3:
-                index = 0
-            time.sleep(0.3)
-            continue
-
-        if up.value:
-            colors[index] += 1
-            if colors[index] == 256:
-                colors[index] = 0
-            rgb_group[index + 3].text = hex(colors[index])[2:]
-            time.sleep(0.01)
-            continue
-
-        if down.value:
-            colors[index] -= 1
-            if colors[index] == -1:
-                colors[index] = 255
-            rgb_group[index + 3].text = hex(colors[index])[2:]
+        # Batch up the channel steps made since the last frame into one redraw
+        if dirty and time.monotonic_ns() >= next_refresh:
+            display.refresh()
+            next_refresh = time.monotonic_ns() + _FRAME_NS
+            dirty = False
+
+        if nav_keys.events.get_into(event):
+            if event.released:
+                held = None
+            elif event.key_number == _SELECT:
+                index += 1
+                if index == 3:
+                    index = 0
+                continue
+            else:
+                # Up and down keep stepping for as long as they are held
+                held = event.key_number
+
+        if held is not None:
+            step = 1 if held == _UP else -1
+            colors[index] = (colors[index] + step) & 0xFF
+            show_channel(index, colors[index])
+            dirty = True
             time.sleep(0.01)
             continue
 
         if submit.value:
-            color = ["{:02x}".format(colors[i]) for i in range(len(colors))]
-            color = "#" + "".join(color)
-            iot.publish("neopixel", color)
+            iot.publish("neopixel", "#%02x%02x%02x" % tuple(colors))
             break
 
         if back.value:
             break
-        time.sleep(0.1)
+        # MQTT isn't polled here, since loop() can't wait less than the client's
+        # socket timeout. The broker allows 1.5x the 60 s keepalive without traffic,
+        # so the connection survives the picker being open for up to 90 s.
+        time.sleep(0.01)
+
+    # Hand refreshing back to the display before the dashboard is shown again
+    display.auto_refresh = True
+
 
-    display.root_group = None
-    time.sleep(0.1)
+last_color_message = None
+last_color = 0
 
 
 def rgb_set_color(message):  # pylint: disable=unused-argument
-    return int(message[1:], 16)
+    # Color feeds often repeat the same value, so only parse it when it changes
+    global last_color_message, last_color  # pylint: disable=global-statement
+    if message != last_color_message:
+        last_color = int(message[1:], 16)
+        last_color_message = message
+    return last_color
 
 
 def door_color(message):
-    door = bool(int(message))
-    if door:
-        return int(0x00FF00)
-    return int(0xFF0000)
+    # Hub only repaints the label when this color changes
+    return _GREEN if int(message) else _RED
 
 
 def on_door(client, feed_id, message):
-    door = bool(int(message))
-    if door:
-        return "Door: Closed"
-    return "Door: Open"
+    return "Door: Closed" if int(message) else "Door: Open"
 
 
 def pub_lamp(lamp):
     if isinstance(lamp, str):
-        lamp = eval(lamp)  # pylint: disable=eval-used
+        lamp = lamp == "True"
     iot.publish("lamp", str(not lamp))
-    # funhouse.set_text(f"Lamp: {not lamp}", 0)
     time.sleep(0.3)
 
 
@@ -198,7 +200,8 @@ print("Connected to %s!" % secrets["ssid"])
 # Create a socket pool
 pool = socketpool.SocketPool(wifi.radio)
 
-# Initialize a new MQTT Client object
+# Initialize a new MQTT Client object. socket_timeout is left at its default,
+# since it also bounds the TCP connect and TLS handshake to Adafruit IO.
 mqtt_client = MQTT.MQTT(
     broker="io.adafruit.com",
     username=secrets["aio_username"],
@@ -210,7 +213,7 @@ mqtt_client = MQTT.MQTT(
 # Initialize an Adafruit IO MQTT Client
 io = IO_MQTT(mqtt_client)
 
-iot = Hub(display=display, io_mqtt=io, nav=(up, select, down, back, submit))
+iot = Hub(display=display, io_mqtt=io, nav=nav_keys.events)
 
 iot.add_device(
     feed_key="lamp",
@@ -248,6 +251,7 @@ iot.add_device(
 
 iot.get()
 
+# The socket wait inside loop() paces this, so no extra sleep is needed. Button
+# presses during the wait are queued by keypad and handled right after it.
 while True:
     iot.loop()
-    time.sleep(0.01)
@@ -10,8 +10,8 @@ from adafruit_esp32spi import adafruit_esp32spi_wifimanager
 import neopixel
 import adafruit_minimqtt.adafruit_minimqtt as MQTT
 from adafruit_io.adafruit_io import IO_MQTT
-from digitalio import DigitalInOut, Direction, Pull
-from adafruit_debouncer import Debouncer
+from digitalio import DigitalInOut
+import keypad
 
 ### WiFi ###
 
@@ -34,10 +34,9 @@ if not secrets:
         print("WiFi secrets are kept in settings.toml, please add them there!")
         raise
 
-switch_pin = DigitalInOut(board.D10)
-switch_pin.direction = Direction.INPUT
-switch_pin.pull = Pull.UP
-switch = Debouncer(switch_pin)
+# The door switch pulls D10 low when the door is closed. keypad watches and debounces
+# it in the background, so the main loop only has to read the queued changes.
+switch = keypad.Keys((board.D10,), value_when_pressed=False, pull=True)
 
 # If you are using a board with pre-defined ESP32 Pins:
 esp32_cs = DigitalInOut(board.ESP_CS)
@@ -78,7 +77,8 @@ print("Connected!")
 pool = adafruit_connection_manager.get_radio_socketpool(esp)
 ssl_context = adafruit_connection_manager.get_radio_ssl_context(esp)
 
-# Initialize a new MQTT Client object
+# Initialize a new MQTT Client object. socket_timeout is left at its default,
+# since it also bounds the TCP connect and TLS handshake to Adafruit IO.
 mqtt_client = MQTT.MQTT(
     broker="io.adafruit.com",
     username=secrets["aio_username"],
@@ -96,15 +96,14 @@ print("Connecting to Adafruit IO...")
 io.connect()
 
 while True:
-    switch.update()
-    print(switch.state)
-
-    if switch.rose:
-        print("Door is open")
-        io.publish("door", 0)
+    event = switch.events.get()
+    if event:
+        if event.pressed:
+            print("Door is closed")
+            io.publish("door", 1)
+        else:
+            print("Door is open")
+            io.publish("door", 0)
         print("sent")
 
-    if switch.fell:
-        print("Door is closed")
-        io.publish("door", 1)
-        print("sent")
+    io.loop()
@@ -33,7 +33,10 @@ if not secrets:
         print("WiFi secrets are kept in settings.toml, please add them there!")
         raise
 
-pixels = neopixel.NeoPixel(board.D5, 300)
+# Only push new colors to the strip once per loop, after every pending message is read
+pixels = neopixel.NeoPixel(board.D5, 300, auto_write=False)
+pixels_dirty = False
+last_message = None
 
 # If you are using a board with pre-defined ESP32 Pins:
 esp32_cs = DigitalInOut(board.ESP_CS)
@@ -79,12 +82,14 @@ def subscribe(client, userdata, topic, granted_qos):
 
 
 def on_neopixel(client, topic, message):
+    global pixels_dirty, last_message  # pylint: disable=global-statement
     print(message)
-    colors = [
-        int(message.split("#")[1][i : i + 2], 16) for i in range(0, len(message) - 1, 2)
-    ]
-    print(colors)
-    pixels.fill(colors)
+    if message == last_message:
+        return
+    last_message = message
+    color = int(message[-6:], 16)
+    pixels.fill((color >> 16, (color >> 8) & 0xFF, color & 0xFF))
+    pixels_dirty = True
 
 
 # Connect to WiFi
@@ -120,3 +125,6 @@ io.get("neopixel")
 
 while True:
     io.loop()
+    if pixels_dirty:
+        pixels.show()
+        pixels_dirty = False
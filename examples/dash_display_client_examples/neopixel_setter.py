@@ -40,20 +40,15 @@ while True:
         time.sleep(0.1)
 
     if funhouse.peripherals.button_up:
-        colors[index] += 1
-        if colors[index] == 256:
-            colors[index] = 0
-        funhouse.set_text(hex(colors[index])[2:], index + 3)
+        colors[index] = (colors[index] + 1) & 0xFF
+        funhouse.set_text("%02x" % colors[index], index + 3)
 
     if funhouse.peripherals.button_down:
-        colors[index] -= 1
-        if colors[index] == -1:
-            colors[index] = 255
-        funhouse.set_text(hex(colors[index])[2:], index + 3)
+        colors[index] = (colors[index] - 1) & 0xFF
+        funhouse.set_text("%02x" % colors[index], index + 3)
 
     if funhouse.peripherals.captouch8:
-        color = ["{:02x}".format(colors[i]) for i in range(len(colors))]
-        color = "#" + "".join(color)
+        color = "#%02x%02x%02x" % tuple(colors)
         break
 
     if funhouse.peripherals.captouch7:
@@ -2,7 +2,6 @@
 # SPDX-License-Identifier: MIT
 
 import time
-import math
 from os import getenv
 import board
 import busio
@@ -159,8 +158,8 @@ last_index = 0
 while True:
     p = ts.touch_point
     if p:
-        x = math.floor(p[0] / 80)
-        y = math.floor(p[1] / 80)
+        x = p[0] // 80
+        y = p[1] // 80
         index = 6 * y + x
         # Used to prevent the touchscreen sending incorrect results
         if last_index == index:
@@ -173,4 +172,4 @@ while True:
                     io.send_data(neopixel_feed["key"], color_str)
                     last_color = color
         last_index = index
-    time.sleep(0.1)
+    time.sleep(0.02)
@@ -81,7 +81,7 @@ def subscribe(client, userdata, topic, granted_qos):
 
 
 def on_lamp(client, topic, message):
-    RELAY.value = eval(message)  # pylint: disable=eval-used
+    RELAY.value = message == "True"
 
 
 # Connect to WiFi
@@ -62,7 +62,8 @@ print("Connected to %s!" % secrets["ssid"])
 # Create a socket pool
 pool = socketpool.SocketPool(wifi.radio)
 
-# Initialize a new MQTT Client object
+# Initialize a new MQTT Client object. socket_timeout is left at its default,
+# since it also bounds the TCP connect and TLS handshake to Adafruit IO.
 mqtt_client = MQTT.MQTT(
     broker="io.adafruit.com",
     username=secrets["aio_username"],
@@ -77,9 +78,8 @@ io = IO_MQTT(mqtt_client)
 
 def pub_lamp(lamp):
     if isinstance(lamp, str):
-        lamp = eval(lamp)  # pylint: disable=eval-used
+        lamp = lamp == "True"
     iot.publish("lamp", str(not lamp))
-    # funhouse.set_text(f"Lamp: {not lamp}", 0)
     time.sleep(0.3)
 
 
@@ -102,6 +102,7 @@ iot.add_device(
 
 iot.get()
 
+# The socket wait inside loop() paces this, so no extra sleep is needed. The
+# buttons are read between waits, so hold one until the highlight moves.
 while True:
     iot.loop()
-    time.sleep(0.01)